@@ -21,6 +21,6 @@ __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS', 'WEB_DIRECTORY']
 # Print a message to console confirming node has loaded
 print("-----------------------------------------")
 print("### Loading: ComfyUI A3D Listener Node (with image support & JS UI) ###")
-print("### - A3D Listener active on ComfyUI routes (/a3d_data and /a3d_events) ###")
+print("### - A3D Listener active on ComfyUI routes (/a3d_data, /a3d_events and /a3d_image) ###")
 print("### - Now supporting image display in node via JS ###")
 print("-----------------------------------------")
\ No newline at end of file
@@ -1,50 +1,216 @@
-import threading
 import json
 import time
 import os
-# import copy # If deep copying of data is needed
 import numpy as np
 import torch
-import base64
+import binascii
+import uuid
+import struct
+from collections import OrderedDict
+from types import MappingProxyType
 from PIL import Image
 from io import BytesIO
 import asyncio # Use asyncio's queue
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from server import PromptServer
 from aiohttp import web
 
+# Diagnostics on the request/broadcast/execute hot paths go through logging at
+# DEBUG level, so they cost nothing (no formatting, no stdout lock) unless enabled
+logger = logging.getLogger(__name__)
+
+# --- Optional SIMD base64 codec ---
+# pybase64 wraps libbase64 (AVX2/AVX-512/NEON kernels). Without it, call the C
+# decoder that base64.b64decode wraps directly: binascii.a2b_base64 skips its
+# type checks and reads an ASCII str in place instead of encoding a copy first.
+# Both ignore non-alphabet characters (no validation) by default.
+try:
+    import pybase64
+    _b64decode = pybase64.b64decode
+except ImportError:
+    _b64decode = binascii.a2b_base64
+
+# --- Optional libjpeg-turbo decoder ---
+# PyTurboJPEG decodes JPEGs with libjpeg-turbo's SIMD IDCT straight into an RGB
+# array, skipping PIL. Needs the libjpeg-turbo shared library to be present.
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+except Exception: # ImportError, or OSError/RuntimeError when the library is missing
+    _turbojpeg = None
+
+# --- Optional fast JSON codec ---
+# orjson parses/serializes UTF-8 directly and is much faster on payloads
+# dominated by large base64 strings.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _json_dumps(obj):
+    """Serialize obj to UTF-8 encoded JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+def _json_loads(data):
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# --- Optional fast hash ---
+# xxh3 hashes at memory bandwidth; Python's built-in hash is the fallback.
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+def _fast_hash(data):
+    """Non-cryptographic 64-bit hash of a str/bytes value."""
+    if xxhash is not None:
+        if isinstance(data, str):
+            data = data.encode() # xxhash only hashes bytes-like objects
+        return xxhash.xxh3_64_intdigest(data)
+    return hash(data)
+
+def hash_image_field(value):
+    """_fast_hash of a base64 image field; None for a missing or non-str value."""
+    if not isinstance(value, str):
+        return None
+    return _fast_hash(value)
+
+# --- Optional lazy JSON parser ---
+# pysimdjson indexes the document in one SIMD pass and only builds Python
+# objects for the keys we access, skipping the rest of a large payload.
+try:
+    import simdjson
+    _simd_parser = simdjson.Parser()
+except ImportError:
+    simdjson = None
+    _simd_parser = None
+
+A3D_PAYLOAD_KEYS = ("color_image_base64", "depth_image_base64", "openpose_image_base64", "metadata")
+
+def parse_a3d_payload(body):
+    """Parse a JSON POST body, materializing only the fields the listener reads."""
+    if _simd_parser is None:
+        return _json_loads(body)
+
+    doc = _simd_parser.parse(body)
+    if not isinstance(doc, simdjson.Object):
+        raise ValueError("Expected a JSON object")
+    data = {}
+    for key in A3D_PAYLOAD_KEYS:
+        value = doc.get(key)
+        if isinstance(value, simdjson.Object):
+            value = value.as_dict()
+        elif isinstance(value, simdjson.Array):
+            value = value.as_list()
+        data[key] = value
+    # The document is only valid until the parser's next parse; nothing lazy escapes
+    return data
+
 # --- Global shared state ---
-# Use a simple list (as thread-safe cache) and lock to store the latest data
-# Queue.Queue could also be used, but if only the latest message matters, variable+lock is simpler
-latest_received_data = {
-    "payload": None,
+# Snapshot of the latest data. It is a read-only mapping: receive_data builds a
+# new one and rebinds the global, which is atomic under the GIL, so readers take
+# `snap = latest_received_data` once and get a consistent view without a lock.
+latest_received_data = MappingProxyType({
     "timestamp": 0,
-    "color_image_base64": None,  # Now as main image
-    "depth_image_base64": None,
-    "openpose_image_base64": None,
     # Add metadata fields
     "prompt": None,
     "negative_prompt": None,
-    "seed": None,
-}
-data_lock = threading.Lock() # Keep threading lock for synchronous access to latest_received_data
+    "seed": 0, # Parsed to int on POST
+    # Images decoded once on POST (RGB uint8 [H, W, C] arrays)
+    "color_image_np": None,
+    "depth_image_np": None,
+    "openpose_image_np": None,
+})
+
+# --- Raw image store for the preview ---
+# Encoded image bytes per received frame, served by /a3d_image so SSE messages
+# only carry small URLs instead of inlined base64. Only touched from the event loop.
+IMAGE_CACHE_SIZE = 8 # Number of recent frames kept available for fetching
+image_cache = OrderedDict() # image_id -> {"color": bytes, "depth": bytes, "openpose": bytes}
+
+# --- Raw pixel uploads ---
+# A sender that already has the pixels can POST them with this Content-Type and
+# skip JSON, base64 and image decoding entirely. The body is a 13-byte header
+# (magic b"A3DR", width and height as little-endian u32, channel count as u8)
+# followed by the HWC uint8 pixels; 4-channel frames have their alpha ignored.
+A3D_RAW_CONTENT_TYPE = 'application/x-a3d-raw'
+A3D_RAW_MAGIC = b'A3DR'
+_A3D_RAW_HEADER = struct.Struct('<4sIIB')
+
+# --- Duplicate frame detection ---
+# A3D may re-send an unchanged scene while idle; identical frames arriving within
+# DEDUP_WINDOW seconds of the last accepted one are acknowledged but skipped.
+DEDUP_WINDOW = 1.0
+_last_frame_key = None
+
+# --- Stale frame detection ---
+# Frames are numbered on arrival. Decodes run concurrently, so an older frame can
+# finish after a newer one has been published; it is then dropped instead of
+# overwriting the newer data (latest frame wins).
+_frame_seq = 0
+_published_seq = 0
+
+# --- Decoded image cache ---
+# A3D often sends a new color frame while the depth/openpose images stay the same.
+# Decode results are kept per image, keyed by (hash, length) of the base64 string,
+# so unchanged images are not decoded again. Only touched from the event loop.
+DECODE_CACHE_SIZE = 8
+_decode_cache = OrderedDict() # (hash, len) -> (image bytes, image_np)
+
+# --- Image decode pool ---
+# Base64/PIL decoding is CPU-bound; run it off the event loop so SSE and other
+# ComfyUI routes keep being served. The C decoders release the GIL, so the
+# images of one request decode in parallel. Sized to the machine, and bounded
+# to avoid thread explosion (a request has at most three images).
+DECODE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+decode_executor = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="a3d_decode")
 
 # --- SSE Specific Globals ---
-sse_clients = {}  # Dictionary to store client connections
-sse_clients_lock = asyncio.Lock() # Use asyncio Lock for async context
-sse_message_queue = asyncio.Queue()  # Use asyncio's Queue
-_sse_processor_started = False # Flag to ensure processor starts only once
-_sse_processor_task = None # Hold a reference to the task
+# client_id -> per-client outgoing asyncio.Queue of SSE frames. Only touched
+# from the event loop and never across an await, so it needs no lock.
+sse_clients = {}
+SSE_CLIENT_QUEUE_SIZE = 32 # Frames buffered per client before the oldest is dropped
+SSE_MAX_CLIENTS = 64 # Further event stream connections are refused with 503
+SSE_HEARTBEAT = b':heartbeat\n\n'
+SSE_HEARTBEAT_INTERVAL = 15 # Seconds of idle time before a heartbeat is sent
+# Single "latest value wins" slot: every message describes the current state,
+# so a newer one supersedes anything not yet broadcast and the backlog is O(1)
+SSE_QUEUE_SIZE = 1
+sse_message_queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)  # Use asyncio's Queue
+_sse_processor_task = None # Singleton processor task; recreated only if it has finished
 
 # Set up the routes
 routes = PromptServer.instance.routes
 
+# --- Helper function for JSON responses ---
+def json_response(data, status=200):
+    """web.json_response equivalent that serializes with _json_dumps (bytes are sent as-is)."""
+    body = data if isinstance(data, bytes) else _json_dumps(data)
+    return web.Response(body=body, status=status, content_type='application/json')
+
+# Canned bodies for fixed responses, serialized once at import
+DUPLICATE_RESPONSE_BODY = _json_dumps({'status': 'success', 'message': 'Duplicate data ignored'})
+IMAGE_NOT_FOUND_RESPONSE_BODY = _json_dumps({'status': 'error', 'message': 'Image not found'})
+SUPERSEDED_RESPONSE_BODY = _json_dumps({'status': 'success', 'message': 'Superseded by newer data'})
+TOO_MANY_CLIENTS_RESPONSE_BODY = _json_dumps({'status': 'error', 'message': 'Too many event stream clients'})
+
 # --- Helper function for CORS headers ---
+# Every response carries the same CORS headers; build the mapping once instead
+# of a fresh dict per response.
+CORS_HEADERS = MappingProxyType({
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Content-Length, Accept, X-Requested-With'
+})
+
 def add_cors_headers(response):
-    response.headers.update({
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Content-Length, Accept, X-Requested-With'
-    })
+    response.headers.update(CORS_HEADERS)
     return response
 
 # --- Option request handler for CORS preflight ---
@@ -54,22 +220,96 @@ async def options_handler(request):
     add_cors_headers(response)
     return response
 
+# --- Helper functions for the raw image store ---
+def store_images(**images):
+    """Store the encoded image bytes of one frame and return its id."""
+    image_id = uuid.uuid4().hex
+    image_cache[image_id] = {kind: raw for kind, raw in images.items() if raw}
+    while len(image_cache) > IMAGE_CACHE_SIZE:
+        image_cache.popitem(last=False) # Evict the oldest frame
+    return image_id
+
+def image_url(image_id, kind):
+    """URL of a stored image, or None if the frame has no image of that kind."""
+    if kind not in image_cache.get(image_id, {}):
+        return None
+    return f"/a3d_image/{image_id}/{kind}"
+
+def guess_image_content_type(raw):
+    """Guess the MIME type of encoded image bytes from their magic number."""
+    if raw.startswith(b'\x89PNG'):
+        return 'image/png'
+    if raw[:4] == b'RIFF' and raw[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+# --- Raw image endpoint for the preview ---
+@routes.get('/a3d_image/{image_id}/{kind}')
+async def image_handler(request):
+    image_id = request.match_info['image_id']
+    kind = request.match_info['kind']
+    frame = image_cache.get(image_id)
+    raw = frame.get(kind) if frame else None
+    if raw is None:
+        response = json_response(IMAGE_NOT_FOUND_RESPONSE_BODY, status=404)
+        return add_cors_headers(response)
+
+    # Image ids are unique per frame, so the content never changes and the id
+    # doubles as a strong ETag
+    etag = f'"{image_id}-{kind}"'
+    headers = {'ETag': etag, 'Cache-Control': 'public, max-age=31536000, immutable'}
+    if request.headers.get('If-None-Match') == etag:
+        return add_cors_headers(web.Response(status=304, headers=headers))
+
+    response = web.Response(body=raw, content_type=guess_image_content_type(raw), headers=headers)
+    return add_cors_headers(response)
+
+# --- Helper function to parse the seed ---
+# Range a seed is clamped to: what JSON encoders like orjson can serialize
+# (signed 64-bit minimum to unsigned 64-bit maximum, ComfyUI's seed range)
+SEED_MIN = -(1 << 63)
+SEED_MAX = (1 << 64) - 1
+
+def parse_seed(seed):
+    """Convert a received seed to int once on ingress, defaulting to 0."""
+    # Handle None, empty string, or convert float/string
+    if seed is None or seed == "":
+        return 0
+    try:
+        seed = int(float(seed)) # Convert via float first for robustness
+    except (ValueError, TypeError, OverflowError):
+        logger.warning("[A3D Handler] Could not convert seed %r to int. Defaulting to 0.", seed)
+        return 0
+    return min(max(seed, SEED_MIN), SEED_MAX)
+
+# --- Helper functions for stale frame detection ---
+def next_frame_seq():
+    """Number an incoming frame in arrival order."""
+    global _frame_seq
+    _frame_seq += 1
+    return _frame_seq
+
+def claim_publish(frame_seq):
+    """Mark frame_seq as published unless a newer frame already was; returns False if stale."""
+    global _published_seq
+    if frame_seq < _published_seq:
+        return False
+    _published_seq = frame_seq
+    return True
+
 # --- Main data receiver endpoint ---
 @routes.post('/a3d_data')
 async def receive_data(request):
-    global latest_received_data, data_lock, sse_message_queue
+    global latest_received_data, sse_message_queue, _last_frame_key
     start_time = time.time()
-    print(f"[A3D Handler {start_time:.2f}] Received request.")
-
-    # Ensure the SSE processor task is running
-    ensure_sse_processor_running() # Call the check here as well
+    logger.debug("[A3D Handler %.2f] Received request.", start_time)
 
     try:
         content_type = request.headers.get('Content-Type', '')
         
         if content_type.startswith('application/json'):
-            data = await request.json()
-            print(f"[A3D Handler {start_time:.2f}] Received JSON data: {type(data)}")
+            data = parse_a3d_payload(await request.read())
+            logger.debug("[A3D Handler %.2f] Received JSON data: %s", start_time, type(data))
             
             # Extract data from the request
             color_image_b64 = data.get("color_image_base64")
@@ -77,91 +317,182 @@ async def receive_data(request):
             openpose_image_b64 = data.get("openpose_image_base64")
             
             # Extract metadata if available
-            metadata = data.get("metadata", {})
+            metadata = data.get("metadata") or {}
             prompt = metadata.get("prompt")
             negative_prompt = metadata.get("negative_prompt")
-            seed = metadata.get("seed")
+            seed = parse_seed(metadata.get("seed"))
+
+            # Skip decode + broadcast if this is the same frame as the last one.
+            # Hashing multi-MB strings is CPU work too, so it runs on the decode pool.
+            loop = asyncio.get_running_loop()
+            color_hash, depth_hash, openpose_hash = await asyncio.gather(*(
+                loop.run_in_executor(decode_executor, hash_image_field, b64)
+                for b64 in (color_image_b64, depth_image_b64, openpose_image_b64)
+            ))
+            frame_key = (color_hash, depth_hash, openpose_hash, prompt, negative_prompt, seed)
+            if frame_key == _last_frame_key and start_time - latest_received_data["timestamp"] < DEDUP_WINDOW:
+                logger.debug("[A3D Handler %.2f] Duplicate frame, skipping update.", start_time)
+                response = json_response(DUPLICATE_RESPONSE_BODY)
+                return add_cors_headers(response)
+            frame_seq = next_frame_seq()
+
+            # Decode the images once here instead of on every node execution,
+            # in parallel on the decode pool. The raw bytes are served to the preview.
+            (
+                (color_image_bytes, color_image_np),
+                (depth_image_bytes, depth_image_np),
+                (openpose_image_bytes, openpose_image_np),
+            ) = await asyncio.gather(
+                decode_base64_image_cached(color_image_b64, color_hash),
+                decode_base64_image_cached(depth_image_b64, depth_hash),
+                decode_base64_image_cached(openpose_image_b64, openpose_hash),
+            )
+            if not claim_publish(frame_seq):
+                logger.debug("[A3D Handler %.2f] Newer frame already published, dropping this one.", start_time)
+                return add_cors_headers(json_response(SUPERSEDED_RESPONSE_BODY))
+
+            image_id = store_images(color=color_image_bytes, depth=depth_image_bytes, openpose=openpose_image_bytes)
             
-            # Update the global data store (still use threading.Lock here as it might be accessed by node's IS_CHANGED)
+            # Publish a new snapshot of the global data store (single atomic rebind)
+            _last_frame_key = frame_key # Only a published frame can suppress a re-send
             current_timestamp = time.time()
-            with data_lock:
-                latest_received_data["payload"] = data
-                latest_received_data["timestamp"] = current_timestamp
-                latest_received_data["color_image_base64"] = color_image_b64
-                latest_received_data["depth_image_base64"] = depth_image_b64
-                latest_received_data["openpose_image_base64"] = openpose_image_b64
-                latest_received_data["prompt"] = prompt
-                latest_received_data["negative_prompt"] = negative_prompt
-                latest_received_data["seed"] = seed
-            print(f"[A3D Handler {start_time:.2f}] Data stored in latest_received_data.")
+            latest_received_data = MappingProxyType({
+                "timestamp": current_timestamp,
+                "prompt": prompt,
+                "negative_prompt": negative_prompt,
+                "seed": seed,
+                "color_image_np": color_image_np,
+                "depth_image_np": depth_image_np,
+                "openpose_image_np": openpose_image_np,
+            })
+            logger.debug("[A3D Handler %.2f] Data stored in latest_received_data.", start_time)
             
-            # Queue message for SSE clients
+            # Queue message for SSE clients (images are fetched separately by URL)
             sse_payload = {
                 "type": "new_images",
                 "timestamp": current_timestamp,
-                "color_image_base64": color_image_b64,
-                "depth_image_base64": depth_image_b64,
-                "openpose_image_base64": openpose_image_b64,
+                "image_id": image_id,
+                "color_url": image_url(image_id, "color"),
+                "depth_url": image_url(image_id, "depth"),
+                "openpose_url": image_url(image_id, "openpose"),
                 "prompt": prompt,
                 "negative_prompt": negative_prompt,
                 "seed": seed,
-                # "payload": data # Avoid sending large raw payload via SSE if possible
             }
             
-            await sse_message_queue.put(sse_payload) # Use await put for asyncio.Queue
-            print(f"[A3D Handler {start_time:.2f}] Data queued for SSE broadcast (Queue size: {sse_message_queue.qsize()}).")
+            # Serialize once here; the broadcaster only fans out the bytes
+            enqueue_sse_message(format_sse_message(sse_payload))
+            logger.debug("[A3D Handler %.2f] Data queued for SSE broadcast (Queue size: %d).", start_time, sse_message_queue.qsize())
             
             # Return success response
-            response = web.json_response({'status': 'success', 'message': f'Data received at {current_timestamp}'})
+            response = json_response({'status': 'success', 'message': f'Data received at {current_timestamp}'})
             return add_cors_headers(response)
             
+        elif content_type.startswith(A3D_RAW_CONTENT_TYPE):
+            body = await request.read()
+            logger.debug("[A3D Handler %.2f] Received raw pixel data of length %d", start_time, len(body))
+
+            # The pixels are wrapped as-is (zero-copy), so nothing is decoded and
+            # there is no encoded image to serve as a preview
+            try:
+                color_image_np = raw_pixels_to_ndarray(body)
+            except ValueError as e:
+                logger.warning("[A3D Handler %.2f] Error processing raw pixel data: %s", start_time, e)
+                response = json_response({'status': 'error', 'message': f'Error processing raw pixel data: {e}'}, status=400)
+                return add_cors_headers(response)
+
+            # Publish a new snapshot of the global data store (other fields carry over)
+            claim_publish(next_frame_seq())
+            _last_frame_key = None # The last JSON frame is no longer the published one
+            current_timestamp = time.time()
+            latest_received_data = MappingProxyType({
+                **latest_received_data,
+                "timestamp": current_timestamp,
+                "color_image_np": color_image_np,
+            })
+
+            sse_payload = {
+                "type": "new_binary_data",
+                "timestamp": current_timestamp,
+                "size": len(body),
+            }
+            enqueue_sse_message(format_sse_message(sse_payload))
+
+            response = json_response({'status': 'success', 'message': f'Raw pixel data received at {current_timestamp}'})
+            return add_cors_headers(response)
+
         else:
             # Handle non-JSON content (binary data)
             body = await request.read()
-            print(f"[A3D Handler {start_time:.2f}] Received non-JSON data of length {len(body)}")
+            logger.debug("[A3D Handler %.2f] Received non-JSON data of length %d", start_time, len(body))
             
-            # Try to encode as base64 if it's image data
+            # Treat the body as an encoded image; the raw bytes are decoded
+            # directly, with no base64 round-trip. Bodies that aren't images are
+            # still accepted (the node then outputs the empty placeholder).
             try:
-                color_image_b64 = base64.b64encode(body).decode('utf-8')
-                if content_type.startswith('image/'):
-                    color_image_b64 = f"data:{content_type};base64,{color_image_b64}"
+                frame_seq = next_frame_seq()
+                color_image_np = await asyncio.get_running_loop().run_in_executor(decode_executor, decode_image_bytes, body)
+                if not claim_publish(frame_seq):
+                    logger.debug("[A3D Handler %.2f] Newer frame already published, dropping this one.", start_time)
+                    return add_cors_headers(json_response(SUPERSEDED_RESPONSE_BODY))
                 
-                # Update the global data store
+                # Publish a new snapshot of the global data store (other fields carry over)
+                _last_frame_key = None # The last JSON frame is no longer the published one
                 current_timestamp = time.time()
-                with data_lock:
-                    latest_received_data["payload"] = {"type": "binary_data", "content_type": content_type}
-                    latest_received_data["timestamp"] = current_timestamp
-                    latest_received_data["color_image_base64"] = color_image_b64
+                latest_received_data = MappingProxyType({
+                    **latest_received_data,
+                    "timestamp": current_timestamp,
+                    "color_image_np": color_image_np,
+                })
                 
-                # Queue message for SSE clients
-                sse_payload = {"type": "new_binary_data", "timestamp": current_timestamp, "size": len(body)}
-                await sse_message_queue.put(sse_payload)
-                print(f"[A3D Handler {start_time:.2f}] Binary data info queued for SSE broadcast (Queue size: {sse_message_queue.qsize()}).")
+                # Queue message for SSE clients (only images get a preview URL)
+                sse_payload = {
+                    "type": "new_binary_data",
+                    "timestamp": current_timestamp,
+                    "size": len(body),
+                }
+                if color_image_np is not None:
+                    sse_payload["color_url"] = image_url(store_images(color=body), "color")
+                enqueue_sse_message(format_sse_message(sse_payload))
+                logger.debug("[A3D Handler %.2f] Binary data info queued for SSE broadcast (Queue size: %d).", start_time, sse_message_queue.qsize())
                 
                 # Return success response
-                response = web.json_response({'status': 'success', 'message': f'Binary data received at {current_timestamp}'})
+                response = json_response({'status': 'success', 'message': f'Binary data received at {current_timestamp}'})
                 return add_cors_headers(response)
                 
             except Exception as e:
-                print(f"[A3D Handler {start_time:.2f}] Error processing binary data: {e}")
-                response = web.json_response({'status': 'error', 'message': f'Error processing binary data: {e}'}, status=400)
+                logger.warning("[A3D Handler %.2f] Error processing binary data: %s", start_time, e)
+                response = json_response({'status': 'error', 'message': f'Error processing binary data: {e}'}, status=400)
                 return add_cors_headers(response)
     
     except Exception as e:
-        print(f"[A3D Handler {start_time:.2f}] Error processing request: {e}")
-        response = web.json_response({'status': 'error', 'message': str(e)}, status=500)
+        logger.error("[A3D Handler %.2f] Error processing request: %s", start_time, e)
+        response = json_response({'status': 'error', 'message': str(e)}, status=500)
         return add_cors_headers(response)
     finally:
         end_time = time.time()
-        print(f"[A3D Handler {start_time:.2f}] Request processing finished in {end_time - start_time:.3f} seconds.")
+        logger.debug("[A3D Handler %.2f] Request processing finished in %.3f seconds.", start_time, end_time - start_time)
 
 # --- SSE endpoint ---
 @routes.get('/a3d_events')
 async def sse_handler(request):
-    global sse_clients, sse_clients_lock
+    global sse_clients
+
+    # Each client holds a queue of up to SSE_CLIENT_QUEUE_SIZE frames, so cap
+    # the number of streams rather than letting memory grow with connections.
+    # The slot is reserved below before the first await, so clients connecting
+    # at the same time can't all get past this check.
+    if len(sse_clients) >= SSE_MAX_CLIENTS:
+        logger.warning("[SSE Handler] Refusing connection, %d clients already connected.", len(sse_clients))
+        return add_cors_headers(json_response(TOO_MANY_CLIENTS_RESPONSE_BODY, status=503))
     
-    # Ensure the SSE processor task is running
-    ensure_sse_processor_running() # Call the check when a client connects
+    # Add client to our registry. The broadcaster only queues frames; this
+    # handler is the client's only writer, so a slow client only delays itself
+    # and heartbeats can never interleave with an event frame.
+    client_queue = asyncio.Queue(maxsize=SSE_CLIENT_QUEUE_SIZE)
+    client_id = id(client_queue)
+    sse_clients[client_id] = client_queue
+    logger.info("[SSE Handler] Client %s connected. Total clients: %d", client_id, len(sse_clients))
     
     # Prepare SSE response
     response = web.StreamResponse()
@@ -170,173 +501,275 @@ async def sse_handler(request):
     response.headers.add('Connection', 'keep-alive')
     add_cors_headers(response)
     
-    await response.prepare(request)
-    
-    # Generate a unique client ID
-    client_id = id(response)
-    
-    # Add client to our registry
-    async with sse_clients_lock:
-        sse_clients[client_id] = response
-        print(f"[SSE Handler] Client {client_id} connected. Total clients: {len(sse_clients)}")
-    
+    get_task = None
     try:
-        # Keep connection alive by sending heartbeats or waiting indefinitely
+        await response.prepare(request)
+        await response.write(SSE_HEARTBEAT)
         while True:
-            # Send a heartbeat comment every 15 seconds to keep connection alive
-            await response.write(b':heartbeat\n\n')
-            await asyncio.sleep(15)
+            # Write the next queued frame, or a heartbeat after an idle interval
+            # to keep the connection alive. The get() task outlives a timeout,
+            # so a frame that arrives just as it fires is not lost.
+            if get_task is None:
+                get_task = asyncio.create_task(client_queue.get())
+            done, _ = await asyncio.wait((get_task,), timeout=SSE_HEARTBEAT_INTERVAL)
+            if not done:
+                await response.write(SSE_HEARTBEAT)
+                continue
+            messages = [get_task.result()]
+            get_task = None
+            # Drain whatever else is queued so a backlog goes out as one write
+            while True:
+                try:
+                    messages.append(client_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await response.write(b"".join(messages))
     except ConnectionResetError:
-        print(f"[SSE Handler] Client {client_id} disconnected (connection reset)")
+        logger.info("[SSE Handler] Client %s disconnected (connection reset)", client_id)
     except asyncio.CancelledError:
-         print(f"[SSE Handler] Client {client_id} connection task cancelled.")
+         logger.info("[SSE Handler] Client %s connection task cancelled.", client_id)
     except Exception as e:
-        print(f"[SSE Handler] Error in SSE connection for client {client_id}: {e}")
+        logger.warning("[SSE Handler] Error in SSE connection for client %s: %s", client_id, e)
     finally:
+        if get_task is not None:
+            get_task.cancel()
         # Remove client when disconnected
-        async with sse_clients_lock:
-            if client_id in sse_clients:
-                del sse_clients[client_id]
-                print(f"[SSE Handler] Client {client_id} removed. Total clients: {len(sse_clients)}")
+        if sse_clients.pop(client_id, None) is not None:
+            logger.info("[SSE Handler] Client %s removed. Total clients: %d", client_id, len(sse_clients))
     
     return response
 
+# --- Helper function to build an SSE frame ---
+def format_sse_message(message_data):
+    """Serialize message_data to a complete SSE "data:" frame."""
+    return b"data: " + _json_dumps(message_data) + b"\n\n"
+
+# --- Helper function for latest-wins queues ---
+def put_drop_oldest(queue, item):
+    """put_nowait that drops the oldest item if the queue is full. Returns True if one was dropped."""
+    try:
+        queue.put_nowait(item)
+        return False
+    except asyncio.QueueFull:
+        try:
+            queue.get_nowait()
+            queue.task_done() # The dropped item counts as handled
+        except asyncio.QueueEmpty:
+            pass
+        queue.put_nowait(item)
+        return True
+
+# --- Function to queue an SSE frame (latest wins) ---
+def enqueue_sse_message(sse_message_bytes):
+    """Queue a frame for broadcast, dropping the oldest one if the queue is full."""
+    if put_drop_oldest(sse_message_queue, sse_message_bytes):
+        logger.debug("[SSE Queue] Queue full, dropped the oldest message.")
+
 # --- Function to broadcast SSE messages ---
-async def broadcast_sse_message(message_data):
-    global sse_clients, sse_clients_lock
+async def broadcast_sse_message(sse_message_bytes):
+    global sse_clients
     start_time = time.time()
-    print(f"[SSE Broadcast {start_time:.2f}] Preparing to broadcast message: {message_data.get('type')}")
+    logger.debug("[SSE Broadcast %.2f] Preparing to broadcast message (%d bytes).", start_time, len(sse_message_bytes))
 
-    # Format message for SSE
-    sse_formatted_message = f"data: {json.dumps(message_data)}\n\n"
-    sse_message_bytes = sse_formatted_message.encode('utf-8')
-    
-    disconnected_clients = []
-    async with sse_clients_lock: # Lock while iterating/writing
-        if not sse_clients:
-            print(f"[SSE Broadcast {start_time:.2f}] No clients connected, skipping broadcast.")
-            return
-
-        print(f"[SSE Broadcast {start_time:.2f}] Broadcasting to {len(sse_clients)} client(s).")
-        for client_id, response in sse_clients.items():
-            try:
-                await response.write(sse_message_bytes)
-                # print(f"[SSE Broadcast {start_time:.2f}] Sent message to client {client_id}") # Can be noisy
-            except ConnectionResetError:
-                print(f"[SSE Broadcast {start_time:.2f}] Client {client_id} disconnected during write (ConnectionResetError). Marking for removal.")
-                disconnected_clients.append(client_id)
-            except Exception as e:
-                # Handle other potential errors like broken pipe etc.
-                print(f"[SSE Broadcast {start_time:.2f}] Error sending to client {client_id}: {e}. Marking for removal.")
-                disconnected_clients.append(client_id)
-
-        # Remove disconnected clients outside the iteration loop
-        for client_id in disconnected_clients:
-            if client_id in sse_clients:
-                del sse_clients[client_id]
-                print(f"[SSE Broadcast {start_time:.2f}] Removed disconnected client {client_id}. Remaining: {len(sse_clients)}")
+    # Snapshot the registry; nothing below awaits, so no lock is needed
+    clients = tuple(sse_clients.items())
+    if not clients:
+        logger.debug("[SSE Broadcast %.2f] No clients connected, skipping broadcast.", start_time)
+        return
+
+    # Hand the frame to each client's writer without awaiting any network I/O;
+    # a client that can't keep up loses its oldest queued frames
+    logger.debug("[SSE Broadcast %.2f] Broadcasting to %d client(s).", start_time, len(clients))
+    for client_id, client_queue in clients:
+        if put_drop_oldest(client_queue, sse_message_bytes):
+            logger.debug("[SSE Broadcast %.2f] Client %s is falling behind, dropped its oldest frame.", start_time, client_id)
     end_time = time.time()
-    print(f"[SSE Broadcast {start_time:.2f}] Broadcast finished in {end_time - start_time:.3f} seconds.")
+    logger.debug("[SSE Broadcast %.2f] Broadcast finished in %.3f seconds.", start_time, end_time - start_time)
 
 # --- SSE message processor task ---
 async def sse_message_processor():
-    print("[SSE Processor] Starting SSE message processor task.")
+    logger.info("[SSE Processor] Starting SSE message processor task.")
     while True:
         try:
-            # Wait until an item is available in the queue
-            # print("[SSE Processor] Waiting for message...") # Can be noisy
+            # Block until an item is available; no polling, no idle wakeups.
+            # The queue is a single latest-wins slot, so there is never a backlog to drain.
             message = await sse_message_queue.get()
-            proc_start_time = time.time()
-            print(f"[SSE Processor {proc_start_time:.2f}] Got message from queue (Type: {message.get('type')}). Queue size now: {sse_message_queue.qsize()}")
+        except asyncio.CancelledError:
+            logger.info("[SSE Processor] Task cancelled.")
+            break # Exit the loop if cancelled
 
+        proc_start_time = time.time()
+        logger.debug("[SSE Processor %.2f] Got message from queue.", proc_start_time)
+        try:
             await broadcast_sse_message(message)
-            sse_message_queue.task_done() # Notify the queue that the task is complete
-            print(f"[SSE Processor {proc_start_time:.2f}] Finished processing message.")
-
+            logger.debug("[SSE Processor %.2f] Finished processing message.", proc_start_time)
         except asyncio.CancelledError:
-            print("[SSE Processor] Task cancelled.")
+            logger.info("[SSE Processor] Task cancelled.")
             break # Exit the loop if cancelled
         except Exception as e:
-            print(f"[SSE Processor] Error processing message: {e}")
-            await asyncio.sleep(1) # Sleep briefly on error before retrying
+            logger.error("[SSE Processor] Error processing message: %s", e)
+        finally:
+            sse_message_queue.task_done() # Notify the queue that the task is complete
 
 # --- Function to ensure the processor task is running ---
 def ensure_sse_processor_running():
-    global _sse_processor_started, _sse_processor_task
-    if not _sse_processor_started:
-        print("[A3D Listener] First check: SSE processor not started. Attempting to start...")
-        loop = asyncio.get_event_loop()
-        # Check if loop is already running, might be needed in some contexts
-        if loop.is_running():
-             print("[A3D Listener] Event loop is running. Creating SSE processor task.")
-             _sse_processor_task = loop.create_task(sse_message_processor())
-             _sse_processor_started = True
-        else:
-             # This case might happen if called very early, might need adjustment
-             # depending on how/when ComfyUI integrates custom nodes/routes.
-             # For now, just log it. Starting it later might be necessary.
-             print("[A3D Listener] Warning: Event loop not running when trying to start SSE processor.")
-             # Optionally, schedule it to run when the loop starts if possible,
-             # but create_task usually handles this.
-
-    # Optional: Check if the task is still running if it was started previously
-    elif _sse_processor_task and _sse_processor_task.done():
-         print("[A3D Listener] Warning: SSE processor task was started but is now done. Restarting...")
-         # Log exception if task failed
-         if _sse_processor_task.exception():
-              print(f"[A3D Listener] SSE processor task failed with exception: {_sse_processor_task.exception()}")
-         loop = asyncio.get_event_loop()
-         _sse_processor_task = loop.create_task(sse_message_processor())
-
-# --- Helper function to convert base64 to tensor ---
-def base64_to_tensor(base64_str):
+    """Start the SSE processor task unless one is already running (idempotent)."""
+    global _sse_processor_task
+    if _sse_processor_task is not None and not _sse_processor_task.done():
+        return
+
+    if _sse_processor_task is None:
+        logger.info("[A3D Listener] SSE processor not started. Creating SSE processor task.")
+    else:
+        logger.warning("[A3D Listener] SSE processor task was started but is now done. Restarting...")
+        # Log exception if task failed
+        if not _sse_processor_task.cancelled() and _sse_processor_task.exception():
+            logger.error("[A3D Listener] SSE processor task failed with exception: %s", _sse_processor_task.exception())
+
+    # Always schedule on ComfyUI's server loop; create_task works before the loop
+    # starts running, and the task begins once it does
+    _sse_processor_task = PromptServer.instance.loop.create_task(sse_message_processor())
+
+# --- Helper functions to decode images ---
+def base64_to_bytes(base64_str):
+    """Decode a base64 image string (optionally a data URI) to encoded image bytes."""
     if not base64_str or not isinstance(base64_str, str):
         return None
     try:
-        # Remove potential data URI prefix
-        if "base64," in base64_str:
-            base64_str = base64_str.split("base64,")[1]
+        # Remove potential data URI prefix. The marker sits near the start, so
+        # only the head is scanned. The payload is encoded to ASCII once and the
+        # prefix skipped with a memoryview, so the base64 text is copied exactly
+        # once whichever decoder is installed (a str slice is a copy as well).
+        idx = base64_str.find("base64,", 0, 256)
+        if idx >= 0:
+            return _b64decode(memoryview(base64_str.encode("ascii"))[idx + 7:])
+
+        return _b64decode(base64_str)
+    except Exception as e:
+        logger.warning("[Image Decode] Error decoding base64 image: %s", e)
+        return None
+
+def decode_image_bytes(image_data):
+    """Decode encoded image bytes (PNG/JPEG/...) to an RGB uint8 [H, W, C] array."""
+    if not image_data:
+        return None
+    try:
+        # Fast path for JPEG when libjpeg-turbo is available
+        if _turbojpeg is not None and image_data[:3] == b'\xff\xd8\xff':
+            try:
+                return _turbojpeg.decode(image_data, pixel_format=TJPF_RGB)
+            except Exception as e:
+                logger.debug("[Image Decode] TurboJPEG decode failed, falling back to PIL: %s", e)
 
-        image_data = base64.b64decode(base64_str)
         img = Image.open(BytesIO(image_data))
-        
+
         # Handle different image modes
         if img.mode == 'RGBA':
-            # Convert RGBA to RGB
-            img_rgb = Image.new('RGB', img.size, (0, 0, 0))
-            img_rgb.paste(img, mask=img.split()[3])  # Use alpha as mask
-            img = img_rgb
+            # Flatten onto black in one C pass (no per-band split() copies)
+            background = Image.new('RGBA', img.size, (0, 0, 0, 255))
+            img = Image.alpha_composite(background, img).convert('RGB')
         elif img.mode == 'L':
             # For grayscale, convert to RGB by duplicating the channel
             img = img.convert('RGB')
         elif img.mode != 'RGB':
             # Convert any other mode to RGB
             img = img.convert('RGB')
-            
-        # Convert to numpy array
-        image_np = np.array(img).astype(np.float32) / 255.0 # Convert to float32 and normalize
-        
-        # Create tensor with batch dimension [B, H, W, C]
-        image_tensor = torch.from_numpy(image_np).unsqueeze(0) # Now float32
-        
-        return image_tensor
+
+        # Single copy out of PIL's buffer; np.array(img) would copy twice.
+        # The array is read-only, which suits a frame shared across nodes.
+        w, h = img.size
+        return np.frombuffer(img.tobytes(), dtype=np.uint8).reshape(h, w, 3)
     except Exception as e:
-        print(f"[Tensor Conversion] Error converting base64 to tensor: {e}")
+        logger.warning("[Image Decode] Error decoding image data: %s", e)
+        return None
+
+def raw_pixels_to_ndarray(body):
+    """Wrap an A3D_RAW_CONTENT_TYPE body as an RGB uint8 [H, W, C] array without copying."""
+    if len(body) < _A3D_RAW_HEADER.size:
+        raise ValueError("Body too short for raw pixel header")
+    magic, width, height, channels = _A3D_RAW_HEADER.unpack_from(body)
+    if magic != A3D_RAW_MAGIC:
+        raise ValueError("Bad raw pixel magic")
+    if channels not in (3, 4):
+        raise ValueError(f"Unsupported channel count {channels}")
+    pixel_count = width * height * channels
+    if width == 0 or height == 0 or len(body) - _A3D_RAW_HEADER.size != pixel_count:
+        raise ValueError(f"Expected {pixel_count} pixel bytes for {width}x{height}x{channels}")
+
+    image_np = np.frombuffer(body, dtype=np.uint8, count=pixel_count, offset=_A3D_RAW_HEADER.size)
+    image_np = image_np.reshape(height, width, channels)
+    if channels == 4:
+        image_np = image_np[..., :3] # Drop alpha (a view; the tensor conversion copies anyway)
+    return image_np
+
+def decode_base64_image(base64_str):
+    """Decode a base64 image string to (encoded image bytes, RGB uint8 [H, W, C] array)."""
+    image_data = base64_to_bytes(base64_str)
+    return image_data, decode_image_bytes(image_data)
+
+async def decode_base64_image_cached(base64_str, base64_hash):
+    """decode_base64_image on the decode pool, memoized for recently seen images."""
+    if not base64_str or not isinstance(base64_str, str):
+        return None, None
+    key = (base64_hash, len(base64_str))
+    entry = _decode_cache.get(key)
+    if entry is not None:
+        _decode_cache.move_to_end(key)
+        return entry
+
+    loop = asyncio.get_running_loop()
+    entry = await loop.run_in_executor(decode_executor, decode_base64_image, base64_str)
+    if entry[1] is not None: # Don't cache failed decodes
+        _decode_cache[key] = entry
+        while len(_decode_cache) > DECODE_CACHE_SIZE:
+            _decode_cache.popitem(last=False) # Evict the least recently used entry
+    return entry
+
+def ndarray_to_tensor(image_np):
+    """Convert an RGB uint8 [H, W, C] array to a normalized float32 [1, H, W, C] tensor."""
+    if image_np is None:
+        return None
+    # torch.tensor copies straight into float32 (and accepts the read-only array),
+    # then normalize in place and add the batch dimension [B, H, W, C]
+    return torch.tensor(image_np, dtype=torch.float32).div_(255.0).unsqueeze(0)
+
+# --- Bounded cache of converted tensors ---
+# Keyed by id() of the decoded array; the entry keeps the array alive so the id
+# can't be reused while cached. Lets every node sharing a frame reuse one tensor.
+# Holds one frame's worth (color, depth, openpose): full-size float32 tensors are large.
+TENSOR_CACHE_SIZE = 3
+_tensor_cache = OrderedDict() # id(image_np) -> (image_np, tensor)
+
+def cached_ndarray_to_tensor(image_np):
+    """ndarray_to_tensor, memoized for the most recently converted arrays."""
+    if image_np is None:
         return None
+    key = id(image_np)
+    entry = _tensor_cache.get(key)
+    if entry is not None and entry[0] is image_np:
+        _tensor_cache.move_to_end(key)
+        return entry[1]
+
+    tensor = ndarray_to_tensor(image_np)
+    _tensor_cache[key] = (image_np, tensor)
+    while len(_tensor_cache) > TENSOR_CACHE_SIZE:
+        _tensor_cache.popitem(last=False) # Evict the least recently used entry
+    return tensor
+
+# --- Placeholder for missing images ---
+# Allocated once (float32, normalized range). Downstream nodes treat inputs as
+# read-only, so it is safe to share.
+_EMPTY_IMAGE = torch.zeros((1, 64, 64, 3), dtype=torch.float32)
 
 # --- ComfyUI Node Class ---
 class A3DListenerNode:
     _last_processed_timestamp = 0  # Track the last timestamp we processed
     
     def __init__(self):
-        print("[A3D Listener Node] Initializing node instance.")
-        # Ensure the SSE processor is running when a node is created
-        ensure_sse_processor_running()
+        logger.debug("[A3D Listener Node] Initializing node instance.")
 
     @classmethod
     def INPUT_TYPES(cls):
-        # Ensure the SSE processor is running when INPUT_TYPES is accessed (early check)
-        ensure_sse_processor_running()
         return {
             "required": {}, 
             "optional": {}
@@ -344,15 +777,14 @@ class A3DListenerNode:
     
     @classmethod
     def IS_CHANGED(cls, **kwargs): # Accept arbitrary kwargs
-        global latest_received_data, data_lock
+        global latest_received_data
         
-        with data_lock:
-            current_timestamp = latest_received_data["timestamp"]
+        current_timestamp = latest_received_data["timestamp"]
         
         # Compare the current timestamp with the last processed one
         # Use a small epsilon to handle potential float comparison issues if needed
         if current_timestamp > cls._last_processed_timestamp:
-            print(f"[A3D IS_CHANGED] New data detected. Timestamp: {current_timestamp}")
+            logger.debug("[A3D IS_CHANGED] New data detected. Timestamp: %s", current_timestamp)
             # New data is available - return the current timestamp 
             # to signal that the node should execute
             return current_timestamp # Returning a changing value triggers execution
@@ -368,13 +800,9 @@ class A3DListenerNode:
     OUTPUT_NODE = True # Keep True if it should display outputs in UI previews
     
     def get_latest_data(self, **kwargs): # Accept arbitrary kwargs
-        global latest_received_data, data_lock
+        global latest_received_data
         exec_start_time = time.time()
-        print(f"[Node Execute {exec_start_time:.2f}] get_latest_data called.")
-
-        # Create a default empty tensor for missing images
-        # Ensure it matches the expected float32 type and normalized range
-        empty_image = torch.zeros((1, 64, 64, 3), dtype=torch.float32)
+        logger.debug("[Node Execute %.2f] get_latest_data called.", exec_start_time)
         
         # --- Variables for tensors and metadata ---
         color_tensor = None
@@ -382,54 +810,49 @@ class A3DListenerNode:
         openpose_tensor = None
         prompt_value = None
         negative_prompt_value = None
-        seed_value = None
+        seed_value = 0
         current_timestamp = 0 # Initialize timestamp
         # ---
         
-        with data_lock:
-            # Get data stored by the last request
-            current_timestamp = latest_received_data["timestamp"]
-            # Update the class-level last processed timestamp ONLY when executing
-            A3DListenerNode._last_processed_timestamp = current_timestamp
-            # Get base64 strings and metadata
-            color_b64 = latest_received_data["color_image_base64"]
-            depth_b64 = latest_received_data["depth_image_base64"]
-            op_b64 = latest_received_data["openpose_image_base64"]
-            prompt_value = latest_received_data["prompt"] or ""
-            negative_prompt_value = latest_received_data["negative_prompt"] or ""
-            seed_value = latest_received_data["seed"] # Keep as is, handle conversion below
+        # Take one consistent snapshot of the data stored by the last request
+        snap = latest_received_data
+        current_timestamp = snap["timestamp"]
+        # Update the class-level last processed timestamp ONLY when executing
+        A3DListenerNode._last_processed_timestamp = current_timestamp
+        # Get decoded images and metadata
+        color_np = snap["color_image_np"]
+        depth_np = snap["depth_image_np"]
+        op_np = snap["openpose_image_np"]
+        prompt_value = snap["prompt"] or ""
+        negative_prompt_value = snap["negative_prompt"] or ""
+        seed_value = snap["seed"] # Already an int, parsed on POST
         
-        print(f"[Node Execute {exec_start_time:.2f}] Processing data from timestamp: {current_timestamp}", flush=True)
+        logger.debug("[Node Execute %.2f] Processing data from timestamp: %s", exec_start_time, current_timestamp)
         
-        # --- Convert base64 to Tensors ---
-        color_tensor = base64_to_tensor(color_b64)
-        depth_tensor = base64_to_tensor(depth_b64)
-        openpose_tensor = base64_to_tensor(op_b64)
+        # --- Convert decoded images to Tensors (shared by every node through the tensor cache) ---
+        color_tensor = cached_ndarray_to_tensor(color_np)
+        depth_tensor = cached_ndarray_to_tensor(depth_np)
+        openpose_tensor = cached_ndarray_to_tensor(op_np)
         # ---
         
         # Use empty tensor if conversion failed or data was None
-        color_tensor = color_tensor if color_tensor is not None else empty_image
-        depth_tensor = depth_tensor if depth_tensor is not None else empty_image
-        openpose_tensor = openpose_tensor if openpose_tensor is not None else empty_image
+        color_tensor = color_tensor if color_tensor is not None else _EMPTY_IMAGE
+        depth_tensor = depth_tensor if depth_tensor is not None else _EMPTY_IMAGE
+        openpose_tensor = openpose_tensor if openpose_tensor is not None else _EMPTY_IMAGE
         
-        # Convert seed to integer if present, default to 0
-        try:
-            # Handle None, empty string, or convert float/string
-            if seed_value is None or seed_value == "":
-                seed_value_int = 0
-            else:
-                seed_value_int = int(float(seed_value)) # Convert via float first for robustness
-        except (ValueError, TypeError):
-             print(f"[Node Execute {exec_start_time:.2f}] Warning: Could not convert seed '{seed_value}' to int. Defaulting to 0.")
-             seed_value_int = 0
-        
-        print(f"[Node Execute {exec_start_time:.2f}] Returning image tensors and metadata (Seed: {seed_value_int}).", flush=True)
+        logger.debug("[Node Execute %.2f] Returning image tensors and metadata (Seed: %d).", exec_start_time, seed_value)
         exec_end_time = time.time()
-        print(f"[Node Execute {exec_start_time:.2f}] Execution finished in {exec_end_time - exec_start_time:.3f} seconds.")
-        return (color_tensor, depth_tensor, openpose_tensor, prompt_value, negative_prompt_value, seed_value_int)
-
-# --- Initial Check ---
-# Call the check function once when the module is loaded.
-# This is likely the best place to ensure it starts early.
-print("[A3D Listener Module] Module loading. Ensuring SSE processor is running.")
-ensure_sse_processor_running()
\ No newline at end of file
+        logger.debug("[Node Execute %.2f] Execution finished in %.3f seconds.", exec_start_time, exec_end_time - exec_start_time)
+        return (color_tensor, depth_tensor, openpose_tensor, prompt_value, negative_prompt_value, seed_value)
+
+# --- Start the SSE processor once with the server ---
+async def _start_sse_processor(app):
+    ensure_sse_processor_running()
+
+try:
+    PromptServer.instance.app.on_startup.append(_start_sse_processor)
+    logger.info("[A3D Listener Module] SSE processor will start with the server.")
+except RuntimeError:
+    # The app has already started (e.g. the module was reloaded); start it now
+    logger.info("[A3D Listener Module] Server already running. Starting SSE processor.")
+    ensure_sse_processor_running()
@@ -27,26 +27,26 @@ function updateNodeImagePreviews(node, messageData) {
         }
     }
 
+    // Helper function to turn an image URL or (legacy) base64 string into an img src
+    const toImageSrc = (imageData) => {
+        if (imageData.startsWith('/') || imageData.startsWith('data:image/') || imageData.startsWith('http')) {
+            return imageData; // Already a URL or data URI
+        }
+        return `data:image/jpeg;base64,${imageData}`; // Assume jpeg if no prefix
+    };
+
     // Helper function to update a single div's background
-    const updateDivBackground = (divElement, base64Data, defaultText = "N/A") => {
+    const updateDivBackground = (divElement, imageData, defaultText = "N/A") => {
         if (!divElement) return;
-        if (base64Data && typeof base64Data === 'string') {
-            // Create an Image object in memory to check validity and potentially get size
+        if (imageData && typeof imageData === 'string') {
+            const imageSrc = toImageSrc(imageData);
+            // Load the image in memory first to check validity and get its size
             const img = new Image();
             img.onload = () => {
                 const w = img.naturalWidth;
                 const h = img.naturalHeight;
-                let mimeType = "image/jpeg"; // Default assumption
-                if (base64Data.startsWith('data:image/png')) mimeType = 'image/png';
-                else if (base64Data.startsWith('data:image/webp')) mimeType = 'image/webp';
-                else if (!base64Data.startsWith('data:image/')) {
-                     // Assume jpeg if no prefix
-                } else {
-                     mimeType = ''; // Has prefix already
-                }
-                const dataUri = mimeType ? `data:${mimeType};base64,${base64Data}` : base64Data;
 
-                divElement.style.backgroundImage = `url("${dataUri}")`;
+                divElement.style.backgroundImage = `url("${imageSrc}")`;
                 divElement.textContent = ''; // Clear placeholder text
                 divElement.title = `Preview (${w}x${h})`;
 
@@ -72,22 +72,15 @@ function updateNodeImagePreviews(node, messageData) {
 
             };
             img.onerror = () => {
-                console.error("[A3D Listener JS] Error loading base64 data for background.");
+                console.error("[A3D Listener JS] Error loading image for background.");
                 divElement.style.backgroundImage = 'none';
                 divElement.textContent = 'Error';
                 divElement.title = 'Error loading image';
             };
-            // Set src for the temporary image
-            let tempMimeType = "image/jpeg";
-            if (base64Data.startsWith('data:image/png')) tempMimeType = 'image/png';
-            else if (base64Data.startsWith('data:image/webp')) tempMimeType = 'image/webp';
-            else if (!base64Data.startsWith('data:image/')) { }
-            else { tempMimeType = ''; }
-            const tempDataUri = tempMimeType ? `data:${tempMimeType};base64,${base64Data}` : base64Data;
-            img.src = tempDataUri;
+            img.src = imageSrc;
 
         } else {
-            // No base64 data provided for this slot
+            // No image provided for this slot
             divElement.style.backgroundImage = 'none';
             divElement.textContent = defaultText;
             divElement.title = defaultText;
@@ -96,9 +89,10 @@ function updateNodeImagePreviews(node, messageData) {
 
     // Update backgrounds for all divs
     console.log("[A3D Listener JS] Updating preview backgrounds...");
-    updateDivBackground(containerWidget.elements.main, messageData.color_image_base64, "Waiting...");
-    updateDivBackground(containerWidget.elements.depth, messageData.depth_image_base64, "Depth N/A");
-    updateDivBackground(containerWidget.elements.openpose, messageData.openpose_image_base64, "Pose N/A");
+    // Images are served by URL; fall back to inlined base64 from older servers
+    updateDivBackground(containerWidget.elements.main, messageData.color_url ?? messageData.color_image_base64 ?? messageData.image_base64, "Waiting...");
+    updateDivBackground(containerWidget.elements.depth, messageData.depth_url ?? messageData.depth_image_base64, "Depth N/A");
+    updateDivBackground(containerWidget.elements.openpose, messageData.openpose_url ?? messageData.openpose_image_base64, "Pose N/A");
     
     // Request redraw after attempting updates (might be redundant if resize happens)
     node.setDirtyCanvas(true, true);
@@ -261,6 +255,10 @@ function connectSSE() {
                      if (listenerNodes && listenerNodes.length > 0) {
                          listenerNodes.forEach(node => updateNodeImagePreviews(node, messageData)); // Still use new func
                      }
+                } else if (messageData.type === "new_binary_data" && messageData.color_url) {
+                     console.log("[A3D Listener JS] Received raw image upload via SSE. Updating main preview.");
+                     const listenerNodes = app.graph.findNodesByType("A3DListener");
+                     listenerNodes?.forEach(node => updateNodeImagePreviews(node, messageData));
                 } else if (messageData.type === "new_data") {
                      console.log("[A3D Listener JS] Received non-image data via SSE:", messageData.payload);
                 }